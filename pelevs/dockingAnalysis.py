@@ -1,7 +1,12 @@
 import os
 import shutil
+import json
+import glob
+import functools
+import io
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import matplotlib.pyplot as plt
-from scipy.stats import linregress
+from scipy.stats import linregress, zscore
 import numpy as np
 import pandas as pd
 import seaborn as sns
@@ -9,6 +14,71 @@ import csv
 from rdkit import Chem
 from rdkit.Chem.Descriptors import ExactMolWt
 
+# Score terms written by rDock for each docked pose
+RDOCK_PROPERTIES = (
+    'SCORE', 'SCORE.INTER', 'SCORE.INTER.CONST', 'SCORE.INTER.POLAR',
+    'SCORE.INTER.REPUL', 'SCORE.INTER.ROT', 'SCORE.INTER.VDW',
+    'SCORE.INTRA', 'SCORE.INTRA.DIHEDRAL', 'SCORE.INTRA.DIHEDRAL.0',
+    'SCORE.INTRA.POLAR', 'SCORE.INTRA.POLAR.0', 'SCORE.INTRA.REPUL',
+    'SCORE.INTRA.REPUL.0', 'SCORE.INTRA.VDW', 'SCORE.INTRA.VDW.0',
+    'SCORE.SYSTEM', 'SCORE.SYSTEM.CONST', 'SCORE.SYSTEM.DIHEDRAL',
+    'SCORE.SYSTEM.POLAR', 'SCORE.SYSTEM.REPUL', 'SCORE.SYSTEM.VDW'
+)
+
+# Columns of the Glide docking and rescoring csvs used in the analysis
+GLIDE_DOCK_COLUMNS = ('SMILES', 'title', 'i_i_glide_lignum',
+                      'r_glide_cpu_time', 'r_i_docking_score')
+GLIDE_SCORE_COLUMNS = ('SMILES', 'title', 'r_glide_cpu_time', 'r_i_docking_score')
+GLIDE_SCORE_DTYPES = {'r_glide_cpu_time': 'float64', 'r_i_docking_score': 'float64'}
+GLIDE_DOCK_DTYPES = {**GLIDE_SCORE_DTYPES, 'i_i_glide_lignum': 'int32'}
+
+# Types of the numeric columns of the csvs written by _rdockDataFrameGenerator
+RDOCK_DATA_DTYPES = {'file_entry': 'int32', 'rdock_score': 'float64'}
+
+# Below this number of ligands the process pool start-up is not worth it
+PARALLEL_MW_THRESHOLD = 1000
+
+# Analysis settings each image in 3_docking_job/images was generated with
+PLOT_SETTINGS_FILE = '3_docking_job/images/plot_settings.json'
+
+
+@functools.lru_cache(maxsize=None)
+def calculate_molecular_weight(smiles):
+    """
+    Compute the molecular weight of a SMILE. Defined at module 
+    level so that it can be sent to worker processes, and cached
+    since datasets often repeat SMILES.
+
+    Parameters
+    ==========
+    smiles : str
+        String with the smiles corresponding to a molecule.
+
+    Returns
+    =======
+    weight : float
+        Exact molecular weight of the molecule.
+    """
+
+    mol = Chem.MolFromSmiles(smiles)
+    return ExactMolWt(mol)
+
+
+def write_bytes(path, data):
+    """
+    Writes binary data to a file.
+
+    Parameters
+    ==========
+    path : str
+        Path of the file to write.
+    data : bytes
+        Content of the file.
+    """
+
+    with open(path, 'wb') as fileout:
+        fileout.write(data)
+
 
 class DockingAnalyzer:
     """
@@ -45,6 +115,9 @@ class DockingAnalyzer:
     _correlationPlotter(self, x, y, docking_method)
         Plotts x and y in a z_score format and stores 
         the image.
+    _scatterFitPlotter(self, x, y, m, n, r, p, xlabel, ylabel, title, path_image)
+        Makes a scatter plot with its linear fit and stores
+        the image.
     _molecularWeightCalculator(self)
         Calculates the molecular weights of the ligands involved
         in the docking.
@@ -70,6 +143,17 @@ class DockingAnalyzer:
     _correlation(self, experimental_data, column_name)
             Generates the directory to store plots and obtains
             x and y vectors to pass onto _correlationPlotter.
+    _savePlot(self, fig, path_image)
+        Stores a figure as a png image and closes it.
+    _waitPlots(self)
+        Waits for the images being written in the background.
+    _plotIsOutdated(self, path_image, sources, settings)
+        Checks if an image has to be generated again.
+    _storePlotSettings(self)
+        Stores the settings the generated images were made with.
+    _resultsFiles(self)
+        Returns the docking output files found by the 
+        results checkers.
     """
 
     def __init__(self):
@@ -84,8 +168,137 @@ class DockingAnalyzer:
         self.calculated_data = None
         self.molecular_weight = None
         self.protocol = None
+        self._results_paths = {}
+        self._force = False
+        self._settings = None
+        self._plot_settings = None
+        self._new_plot_settings = {}
+        self._png_pool = None
+        self._png_futures = []
+
+    def _savePlot(self, fig, path_image):
+        """
+        Stores a figure as a png image and closes it. While an analysis
+        is running the encoded image is written to disk by a background
+        thread so that the next figure can be prepared meanwhile.
 
-    def _correlationPlotter(self, x, y, docking_method, protocol):
+        Parameters
+        ==========
+        fig : matplotlib.figure.Figure
+            Figure to store.
+        path_image : str
+            Path where the image is stored.
+        """
+
+        if self._png_pool is None:
+            fig.savefig(path_image, format='png')
+        else:
+            buffer = io.BytesIO()
+            fig.savefig(buffer, format='png')
+            self._png_futures.append(self._png_pool.submit(
+                write_bytes, path_image, buffer.getvalue()))
+
+        plt.close(fig)
+
+    def _waitPlots(self):
+        """
+        Waits until all the images sent to the background writer
+        are stored and raises any error found writing them.
+        """
+
+        if self._png_pool is not None:
+            self._png_pool.shutdown(wait=True)
+            self._png_pool = None
+
+        futures, self._png_futures = self._png_futures, []
+
+        for future in futures:
+            future.result()
+
+    def _plotIsOutdated(self, path_image, sources, settings=None):
+        """
+        Checks if an image has to be generated: because it does not
+        exist, because any of the files it is made from is newer, 
+        because it was made with other analysis settings, or
+        because the analysis has been forced.
+
+        Parameters
+        ==========
+        path_image : str
+            Path of the image to generate.
+        sources : list
+            Paths of the files the image's data comes from. If None,
+            the image is always generated.
+        settings : dict
+            Analysis settings the image's data depends on (e.g. 
+            column_name or poses_per_ligand).
+
+        Returns
+        =======
+        outdated : bool
+            True if the image has to be generated.
+        """
+
+        outdated = self._force or sources is None or not os.path.isfile(path_image) or \
+            any(os.path.getmtime(x) > os.path.getmtime(path_image) for x in sources)
+
+        if settings is not None:
+            if self._plot_settings is None:
+                self._plot_settings = {}
+                if os.path.isfile(PLOT_SETTINGS_FILE):
+                    with open(PLOT_SETTINGS_FILE, 'r') as filein:
+                        self._plot_settings = json.load(filein)
+
+            name = os.path.basename(path_image)
+            outdated = outdated or self._plot_settings.get(name) != settings
+
+            # Stored by _storePlotSettings once the analysis is finished
+            if outdated:
+                self._new_plot_settings[name] = settings
+
+        return outdated
+
+    def _storePlotSettings(self):
+        """
+        Stores the settings the images generated in the analysis were
+        made with, once all of them have been generated.
+        """
+
+        if not self._new_plot_settings:
+            return
+
+        self._plot_settings.update(self._new_plot_settings)
+        self._new_plot_settings = {}
+
+        with open(PLOT_SETTINGS_FILE, 'w') as fileout:
+            json.dump(self._plot_settings, fileout, indent=4)
+
+    def _resultsFiles(self):
+        """
+        Returns the paths of the docking output files found by the
+        results checkers of the current docking tool and protocol.
+
+        Returns
+        =======
+        files : list
+            Paths of the docking output files.
+        """
+
+        key = '{}_{}'.format(self.docking_tool, self.protocol)
+        results = self._results_paths.get(key)
+
+        if results is None:
+            return []
+        elif key == 'glide_dock':
+            return [results]
+        elif key == 'rdock_dock':
+            return [os.path.join('3_docking_job/job/results', x) for x in results]
+        elif key == 'rdock_score':
+            return [os.path.join('3_docking_job/rdock_score', x, 'ligand_out.sd') for x in results]
+        else:
+            return results
+
+    def _correlationPlotter(self, x, y, docking_method, protocol, z_x=None, z_y=None, sources=None):
         """
         Makes a scatter plot of the two vectors' z-score
         and finds the correlation between them
@@ -98,55 +311,101 @@ class DockingAnalyzer:
             Array with the y-axis values
         docking_method : str
             Method with which the values have been obtained.
+        z_x : np.array
+            Precomputed z-scores of x. Calculated if not given.
+        z_y : np.array
+            Precomputed z-scores of y. Calculated if not given.
+        sources : list
+            Files the data comes from. Images newer than all of 
+            them are not generated again.
+
+        Returns
+        =======
+        plotted : bool
+            False if the images were up to date and not generated.
         """
 
         # Creating a folder to store plots
         if not os.path.isdir('3_docking_job/images'):
             os.mkdir('3_docking_job/images')
 
+        prefix = 'rescoring_' if protocol == 'score' else ''
+        path_zscore = '3_docking_job/images/{}{}_zscore_correlation.png'.format(
+            prefix, docking_method)
+        path_raw = '3_docking_job/images/{}{}_correlation.png'.format(
+            prefix, docking_method)
+
+        plot_zscore = self._plotIsOutdated(path_zscore, sources, self._settings)
+        plot_raw = self._plotIsOutdated(path_raw, sources, self._settings)
+
+        if not (plot_zscore or plot_raw):
+            return False
+
         # Calculate z-scores for x and y
-        z_x = (x - np.mean(x)) / np.std(x)
-        z_y = (y - np.mean(y)) / np.std(y)
+        if z_x is None:
+            z_x = zscore(x)
+        if z_y is None:
+            z_y = zscore(y)
 
-        m_z, n_z, r_z, p_z, _ = linregress(z_x, z_y)
+        # z-scoring is linear: r and p are the same for the raw values
+        m_z, n_z, r, p, _ = linregress(z_x, z_y)
 
-        plt.figure()
-        plt.scatter(z_x, z_y)
+        if plot_zscore:
+            self._scatterFitPlotter(z_x, z_y, m_z, n_z, r, p,
+                                    'Z score experimental', 'Z score calculated',
+                                    '{} Z-score correlation'.format(docking_method), path_zscore)
 
-        # Set labels and title
-        plt.xlabel('Z score experimental')
-        plt.ylabel('Z score calculated')
-        plt.title('{} Z-score correlation'.format(docking_method))
-        plt.plot(z_x, m_z*np.array(z_x) + n_z, color='orange',
-                 label='r = {:.2f}\np = {:.2f}\nn = {}'.format(r_z, p_z, len(x)))
-        plt.legend(loc='best')
-        
-        if protocol == 'dock':
-            plt.savefig(
-            '3_docking_job/images/{}_zscore_correlation.png'.format(docking_method), format='png')
-        if protocol == 'score':
-            plt.savefig(
-            '3_docking_job/images/rescoring_{}_zscore_correlation.png'.format(docking_method), format='png')
+        if plot_raw:
+            m = m_z * np.std(y) / np.std(x)
+            n = np.mean(y) - m * np.mean(x)
+
+            self._scatterFitPlotter(x, y, m, n, r, p,
+                                    'Experimental', 'Calculated',
+                                    '{} correlation'.format(docking_method), path_raw)
+
+        return True
 
-        m, n, r, p, _ = linregress(x, y)
+    def _scatterFitPlotter(self, x, y, m, n, r, p, xlabel, ylabel, title, path_image):
+        """
+        Makes a scatter plot of two vectors with their linear fit
+        and stores the image.
+
+        Parameters
+        ==========
+        x : np.array
+            Array with the x-axis values
+        y : np.array
+            Array with the y-axis values
+        m : float
+            Slope of the fit.
+        n : float
+            Intercept of the fit.
+        r : float
+            Correlation coefficient of the fit.
+        p : float
+            p-value of the fit.
+        xlabel : str
+            Label of the x-axis.
+        ylabel : str
+            Label of the y-axis.
+        title : str
+            Title of the plot.
+        path_image : str
+            Path where the image is stored.
+        """
 
-        plt.figure()
-        plt.scatter(x, y)
+        fig, ax = plt.subplots()
+        ax.scatter(x, y)
 
         # Set labels and title
-        plt.xlabel('Experimental')
-        plt.ylabel('Calculated')
-        plt.title('{} correlation'.format(docking_method))
-        plt.plot(x, m*np.array(x) + n, color='orange',
-                 label='r = {:.2f}\np = {:.2f}\nn = {}'.format(r, p, len(x)))
-        plt.legend(loc='best')
+        ax.set_xlabel(xlabel)
+        ax.set_ylabel(ylabel)
+        ax.set_title(title)
+        ax.plot(x, m*x + n, color='orange',
+                label='r = {:.2f}\np = {:.2f}\nn = {}'.format(r, p, len(x)))
+        ax.legend(loc='best')
 
-        if protocol == 'dock':
-            plt.savefig(
-            '3_docking_job/images/{}_correlation.png'.format(docking_method), format='png')
-        if protocol == 'score':
-            plt.savefig(
-            '3_docking_job/images/rescoring_{}_correlation.png'.format(docking_method), format='png')
+        self._savePlot(fig, path_image)
 
     def _molecularWeightCalculator(self):
         ''''
@@ -154,20 +413,6 @@ class DockingAnalyzer:
         values in a csv.
         '''
 
-        def calculate_molecular_weight(smiles):
-            ''''
-            Compute the molecular weight per SMILE.
-
-            Parameters
-            ==========
-
-            smiles : str
-                String with the smiles corresponding to a molecule.
-            '''
-
-            mol = Chem.MolFromSmiles(smiles)
-            return ExactMolWt(mol)
-
         path = '1_input_files/molecular_weight'
         path_images = '3_docking_job/images'
 
@@ -177,28 +422,52 @@ class DockingAnalyzer:
         if not os.path.isdir(path):
             os.mkdir(path)
 
-        ligand_file = os.listdir('1_input_files/ligands/')[0]
-        df = pd.read_csv(os.path.join(
-            '1_input_files/ligands/', ligand_file), header=None)
+        path_ligands = os.path.join('1_input_files/ligands/', self.ligands)
+        path_cache = os.path.join(path, 'molecular_weight.csv')
+
+        # Reuse previous results if the ligands have not changed since
+        if not self._force and os.path.isfile(path_cache) and \
+                os.path.getmtime(path_cache) >= os.path.getmtime(path_ligands):
+            new_df = pd.read_csv(path_cache, index_col=0)
+            print(' - Molecular weights retrieved from {}'.format(path_cache))
+
+        else:
+            df = pd.read_csv(path_ligands, header=None)
+
+            smiles = df.iloc[:, 0].to_numpy()
+
+            if len(smiles) < PARALLEL_MW_THRESHOLD:
+                molecular_weights = np.fromiter(map(calculate_molecular_weight, smiles),
+                                                dtype=np.float64, count=len(smiles))
+            else:
+                chunksize = max(1, len(smiles) // ((os.cpu_count() or 1) * 4))
+                with ProcessPoolExecutor() as executor:
+                    molecular_weights = np.fromiter(executor.map(calculate_molecular_weight, smiles, chunksize=chunksize),
+                                                    dtype=np.float64, count=len(smiles))
+
+            new_df = pd.DataFrame({'ligand': np.arange(len(smiles), dtype=np.int32),
+                                   'molecular_weight': molecular_weights})
 
-        molecular_weights = df.iloc[:, 0].apply(calculate_molecular_weight)
-        new_df = pd.DataFrame(
-            {'ligand': df.index, 'molecular_weight': molecular_weights})
+            new_df.to_csv(path_cache)
 
-        new_df.to_csv(os.path.join(path, 'molecular_weight.csv'))
+            calculate_molecular_weight.cache_clear()
 
         self.molecular_weight = new_df
 
         # Histogram plot
-        plt.figure()
-        sns.histplot(data=new_df, x='molecular_weight',
-                     kde=True, stat='density', alpha=0.5)
-        plt.xlabel('MW (Da)')
-        plt.ylabel('Density')
-        plt.title('MW Distribution')
-        plt.savefig('3_docking_job/images/mw_distribution.png', format='png')
-
-    def _doubleCorrelationPlotter(self, experimental, calculated, molecular_weights, docking_method, protocol):
+        path_histogram = '3_docking_job/images/mw_distribution.png'
+
+        if self._plotIsOutdated(path_histogram, [path_ligands]):
+            fig, ax = plt.subplots()
+            sns.histplot(data=new_df, x='molecular_weight',
+                         kde=True, stat='density', alpha=0.5, ax=ax)
+            ax.set_xlabel('MW (Da)')
+            ax.set_ylabel('Density')
+            ax.set_title('MW Distribution')
+            self._savePlot(fig, path_histogram)
+
+    def _doubleCorrelationPlotter(self, experimental, calculated, molecular_weights, docking_method, protocol,
+                                  z_exp=None, z_cal=None, z_mw=None, sources=None):
         """
         Makes a scatter plot of the two first vectors against the third with z-score
         and finds the correlation between them.
@@ -213,17 +482,40 @@ class DockingAnalyzer:
             Array with molecular weights of the ligands.
         docking_method : str
             Method with which the values have been obtained.
+        z_exp : np.array
+            Precomputed z-scores of experimental. Calculated if not given.
+        z_cal : np.array
+            Precomputed z-scores of calculated. Calculated if not given.
+        z_mw : np.array
+            Precomputed z-scores of molecular_weights. Calculated if not given.
+        sources : list
+            Files the data comes from. An image newer than all of 
+            them is not generated again.
+
+        Returns
+        =======
+        plotted : bool
+            False if the image was up to date and not generated.
         """
 
         # Creating a folder to store plots
         if not os.path.isdir('3_docking_job/images'):
             os.mkdir('3_docking_job/images')
 
-        # Calculate z-scores for x and y
-        z_mw = (molecular_weights - np.mean(molecular_weights)) / \
-            np.std(molecular_weights)
-        z_exp = (experimental - np.mean(experimental)) / np.std(experimental)
-        z_cal = (calculated - np.mean(calculated)) / np.std(calculated)
+        prefix = 'rescoring_' if protocol == 'score' else ''
+        path_image = '3_docking_job/images/{}{}_mw_zscore_correlation.png'.format(
+            prefix, docking_method)
+
+        if not self._plotIsOutdated(path_image, sources, self._settings):
+            return False
+
+        # Calculate z-scores for the three vectors
+        if z_mw is None:
+            z_mw = zscore(molecular_weights)
+        if z_exp is None:
+            z_exp = zscore(experimental)
+        if z_cal is None:
+            z_cal = zscore(calculated)
 
         m_exp, n_exp, r_exp, p_exp, _ = linregress(z_mw, z_exp)
         m_cal, n_cal, r_cal, p_cal, _ = linregress(z_mw, z_cal)
@@ -235,7 +527,7 @@ class DockingAnalyzer:
         ax1.set_ylabel('Z score energy')
         ax1.set_title('MW vs experimental: Z-score correlation')
         ax1.scatter(z_mw, z_exp, label='experimental')
-        ax1.plot(z_mw, m_exp*np.array(z_mw) + n_exp, color='orange',
+        ax1.plot(z_mw, m_exp*z_mw + n_exp, color='orange',
                  label='r = {:.2f}\np = {:.2f}\nn = {}'.format(r_exp, p_exp, len(z_mw)))
         ax1.legend(loc='best')
 
@@ -251,20 +543,16 @@ class DockingAnalyzer:
             ' MW vs {} score: Z-score correlation'.format(docking_method, docking_method))
         ax2.scatter(z_mw, z_cal, marker='x', color='black',
                     label='{}'.format(docking_method))
-        ax2.plot(z_mw, m_cal*np.array(z_mw) + n_cal, color='#a020f0', linestyle=':',
+        ax2.plot(z_mw, m_cal*z_mw + n_cal, color='#a020f0', linestyle=':',
                  label='r = {:.2f}\np = {:.2f}\nn = {}'.format(r_cal, p_cal, len(z_mw)))
         ax2.legend(loc='best')
 
         # General title for the entire figure
         fig.suptitle('MW vs Energy', fontsize=16)
-        plt.tight_layout()
-        
-        if protocol == 'dock':
-            plt.savefig(
-            '3_docking_job/images/{}_mw_zscore_correlation.png'.format(docking_method), format='png')
-        if protocol == 'score':
-            plt.savefig(
-            '3_docking_job/images/rescoring_{}_mw_zscore_correlation.png'.format(docking_method), format='png')
+        fig.tight_layout()
+        self._savePlot(fig, path_image)
+
+        return True
 
     def _glideDockingResultsChecker(self, protocol):
         """
@@ -281,6 +569,8 @@ class DockingAnalyzer:
             if not os.path.isfile(path_results):
                 raise Exception(
                     'ResultsMissingError: Before initializing the object the results must be downloaded at {}'.format(path_docking))
+
+            self._results_paths['glide_dock'] = path_results
             
         elif protocol == 'score':
             path_docking = '3_docking_job/glide_score'
@@ -295,6 +585,8 @@ class DockingAnalyzer:
                 raise Exception(
                     'ResultsMissingError: Before initializing the object the results must be downloaded at {}'.format(path_docking))
 
+            self._results_paths['glide_score'] = paths_to_check
+
         print(' - Glide docking results found')
 
         self.docking_tool = 'glide'
@@ -312,28 +604,20 @@ class DockingAnalyzer:
 
         if protocol == 'dock':
 
-            path_docking = '3_docking_job/job'
-            path_results = os.path.join(
-                path_docking, [x for x in os.listdir(path_docking) if x.endswith('.csv')][0])
+            # Path found by _glideDockingResultsChecker
+            path_results = self._results_paths['glide_dock']
             
             # Keeping important columns
-            df_og = pd.read_csv(path_results)
-            columns_to_keep = ['SMILES', 'title', 'i_i_glide_lignum',
-                            'r_glide_cpu_time', 'r_i_docking_score']
-            df = df_og[columns_to_keep].copy()
-
-            # Adding molecule number to the dataframe
-            prev_title = None
-            prev_value = None
-            modified_i_i_glide_lignum = np.zeros(df.shape[0], dtype=int)
-
-            for i, row in df.iterrows():
-                if row['title'] != prev_title:
-                    prev_title = row['title']
-                    prev_value = row['i_i_glide_lignum']
-                modified_i_i_glide_lignum[i] = row['i_i_glide_lignum'] - prev_value
+            columns_to_keep = list(GLIDE_DOCK_COLUMNS)
+            df = pd.read_csv(path_results, engine='c', usecols=columns_to_keep,
+                             dtype=GLIDE_DOCK_DTYPES)[columns_to_keep]
 
-            df.insert(2, 'conformer', modified_i_i_glide_lignum + 1)
+            # Adding conformer number to the dataframe
+            first_lignum = df.groupby('title', sort=False)[
+                'i_i_glide_lignum'].transform('first')
+            df['conformer'] = (df['i_i_glide_lignum'] -
+                               first_lignum + 1).astype('int32')
+            df.insert(2, 'conformer', df.pop('conformer'))
 
             df.to_csv('3_docking_job/Glide_whole_dataset.csv')
 
@@ -344,12 +628,8 @@ class DockingAnalyzer:
             
             if poses_per_ligand == 1:
 
-                df_result = df_csv_sort.drop_duplicates(['title', 'i_i_glide_lignum'])
-                sorted_df = df_result.sort_values(['title', 'i_i_glide_lignum'])
-
-                sorted_df = sorted_df.sort_values('r_i_docking_score')
-                sorted_df = sorted_df.drop_duplicates('title')
-                sorted_df = sorted_df.sort_values('title')
+                sorted_df = df_csv_sort.drop_duplicates(
+                    'title').sort_values('title')
 
                 sorted_df.to_csv('3_docking_job/Glide_dataset.csv')
                 self.calculated_data = sorted_df
@@ -376,20 +656,11 @@ class DockingAnalyzer:
             print(' - Csv information imported and sorted (self.calculated_data)')
 
         elif protocol == 'score':
-            path_docking = '3_docking_job/glide_score'
-    
-            paths_to_check = []
-            for ligand in [x for x in os.listdir(path_docking) if (x != '.ipynb_checkpoints') and (x != 'glide_score.csv')]:
-                path_ligand = os.path.join(path_docking,ligand)
-                path_csv = os.path.join(path_ligand,[x for x in os.listdir(path_ligand) if x.endswith('_score.csv')][0])
-                paths_to_check.append(path_csv)
-
-            dfs = []
-            for file in paths_to_check:
-                df = pd.read_csv(file)
-                dfs.append(df)
+            # Paths found by _glideDockingResultsChecker
+            dfs = [pd.read_csv(file, engine='c', usecols=lambda x: x in GLIDE_SCORE_COLUMNS,
+                               dtype=GLIDE_SCORE_DTYPES) for file in self._results_paths['glide_score']]
 
-            merged_df = pd.concat(dfs, ignore_index=True)
+            merged_df = pd.concat(dfs, ignore_index=True, copy=False)
             merged_df.to_csv('3_docking_job/glide_score/glide_score.csv')
             self.calculated_data = merged_df
 
@@ -400,31 +671,36 @@ class DockingAnalyzer:
         """
 
         path_images = '3_docking_job/images/'
+        prefix = 'rescoring_' if self.protocol == 'score' else ''
+        path_image = os.path.join(path_images, '{}glide_time_distribution.png'.format(prefix))
 
         if not os.path.isdir(path_images):
             os.mkdir(path_images)
+
+        if not self._plotIsOutdated(path_image, self._resultsFiles(), self._settings):
+            print(' - Time distribution figure is up to date (use force=True to generate it again).')
+            return
             
         df = self.calculated_data
 
-        plt.figure()
-        plt.hist(df['r_glide_cpu_time'], bins=10,
-                 alpha=0.3, color='blue', density=True)
+        fig, ax = plt.subplots()
+        ax.hist(df['r_glide_cpu_time'], bins=10,
+                alpha=0.3, color='blue', density=True)
 
-        kde = sns.kdeplot(df['r_glide_cpu_time'], color='red')
+        kde = sns.kdeplot(df['r_glide_cpu_time'], color='red', ax=ax)
 
         x_max = kde.get_lines()[0].get_data()[
             0][kde.get_lines()[0].get_data()[1].argmax()]
 
-        plt.axvline(x_max, color='black', linestyle='--',
-                    label='Max KDE: {:.2f}'.format(x_max))
+        ax.axvline(x_max, color='black', linestyle='--',
+                   label='Max KDE: {:.2f}'.format(x_max))
 
-        plt.xlabel("Glide's cpu time (s)")
-        plt.ylabel("Density")
-        plt.title("Glide's time distribution")
-        plt.xlim(0, df['r_glide_cpu_time'].max())
-        plt.legend()
-        plt.savefig(
-            '3_docking_job/images/glide_time_distribution.png', format='png')
+        ax.set_xlabel("Glide's cpu time (s)")
+        ax.set_ylabel("Density")
+        ax.set_title("Glide's time distribution")
+        ax.set_xlim(0, df['r_glide_cpu_time'].max())
+        ax.legend()
+        self._savePlot(fig, path_image)
 
         print(' - Time distribution figure plotted correctly.')
 
@@ -446,33 +722,29 @@ class DockingAnalyzer:
 
             path_docking = '3_docking_job/job/results'
             path_results = [x for x in os.listdir(
-                path_docking) if x.endswith('.sd')][0]
+                path_docking) if x.endswith('.sd')]
 
-            if len(path_results) == 0 and path_results[0].endswith('sd'):
+            if len(path_results) == 0:
                 raise Exception(
                     'ResultsMissingError: Before initializing the object the results must be downloaded and located at {}'.format(path_docking))
 
+            self._results_paths['rdock_dock'] = path_results
+
         elif protocol == 'score':
 
             self.protocol = 'score'
             self.docking_tool = 'rdock'
 
             path_score = '3_docking_job/rdock_score'
-            output_files = 0
-            input_folders = 0
 
-            for folder in [x for x in os.listdir(path_score) if os.path.isdir(os.path.join(path_score, x))]:
-                input_folders += 1
-                path_folder_score = os.path.join(path_score, folder)
-                for file in os.listdir(path_folder_score):
-                    if file == 'ligand_out.sd':
-                        output_files += 1
+            inputs = [x for x in glob.glob(os.path.join(path_score, '*')) if os.path.isdir(x)]
+            outputs = glob.glob(os.path.join(path_score, '*', 'ligand_out.sd'))
 
-            outputs_per_inputs = output_files/input_folders
-
-            if outputs_per_inputs != 1:
+            if len(inputs) == 0 or len(outputs) != len(inputs):
                 raise Exception(
-                    'OutputError: No tall the simulations have generated an output.')
+                    'OutputError: Not all the simulations have generated an output.')
+
+            self._results_paths['rdock_score'] = [os.path.basename(x) for x in inputs]
 
         else:
             raise Exception(
@@ -491,42 +763,29 @@ class DockingAnalyzer:
             folder_path = '3_docking_job/job/results'
             storage_path = '3_docking_job/'
 
-            data = []
-
-            for filename in [x for x in os.listdir(folder_path) if x.startswith('split')]:
-                file_path = os.path.join(folder_path, filename)
-
-                counter = 1
-                score_bool = False
-                conformer_bool = False
-
-                # Open the file
-                with open(file_path, 'r') as file:
-                    for line in file:
-                        if score_bool:
-                            score = line.split()[0]
-                        if conformer_bool:
-                            ligand, conformer = line.split('-')
-                            data.append(
-                                [filename, counter, ligand, conformer, score])
-                        if '$$$$' in line:
-                            counter += 1
-                        if '>  <SCORE>' in line:
-                            score_bool = True
-                        else:
-                            score_bool = False
-                        if '>  <s_lp_Variant>' in line:
-                            conformer_bool = True
-                        else:
-                            conformer_bool = False
-
-            # Write the extracted data to a CSV file
             output_file = 'rDock_data.csv'
+
+            # Records are written to the CSV file as they are read
             with open(os.path.join(storage_path, output_file), 'w', newline='') as csvfile:
                 writer = csv.writer(csvfile)
                 writer.writerow(['file_name', 'file_entry', 'ligand',
                                  'conformer', 'rdock_score'])
-                writer.writerows(data)
+
+                for filename in [x for x in self._results_paths['rdock_dock'] if x.startswith('split')]:
+                    file_path = os.path.join(folder_path, filename)
+
+                    supplier = Chem.SDMolSupplier(
+                        file_path, sanitize=False, strictParsing=False)
+
+                    for counter, mol in enumerate(supplier, start=1):
+                        if mol is None:
+                            continue
+
+                        score = float(mol.GetProp('SCORE'))
+                        ligand, conformer = mol.GetProp(
+                            's_lp_Variant').rsplit('-', 1)
+                        writer.writerow(
+                            (filename, counter, ligand, conformer, score))
 
             print(' - rDock data extraction completed.')
             print(' - Data saved in {}'.format(os.path.join(storage_path, output_file)))
@@ -537,39 +796,29 @@ class DockingAnalyzer:
             folder_path = '3_docking_job/rdock_score'
             storage_path = '3_docking_job/'
 
-            data = []
-
-            for filename in [x for x in os.listdir(folder_path) if os.path.isdir(os.path.join(folder_path, x))]:
-                file_path = os.path.join(
-                    folder_path, filename, 'ligand_out.sd')
-
-                ligand = filename
-
-                counter = 1
-                score_bool = False
-                conformer_bool = False
-
-                # Open the file
-                with open(file_path, 'r') as file:
-                    for line in file:
-                        if score_bool:
-                            score = line.split()[0]
-                            data.append(
-                                [filename, counter, ligand, score])
-                        if '$$$$' in line:
-                            counter += 1
-                        if '>  <SCORE>' in line:
-                            score_bool = True
-                        else:
-                            score_bool = False
-
-            # Write the extracted data to a CSV file
             output_file = 'rDock_rescore_data.csv'
+
+            # Records are written to the CSV file as they are read
             with open(os.path.join(storage_path, output_file), 'w', newline='') as csvfile:
                 writer = csv.writer(csvfile)
                 writer.writerow(
                     ['file_name', 'file_entry', 'ligand', 'rdock_score'])
-                writer.writerows(data)
+
+                for filename in self._results_paths['rdock_score']:
+                    file_path = os.path.join(
+                        folder_path, filename, 'ligand_out.sd')
+
+                    ligand = filename
+
+                    supplier = Chem.SDMolSupplier(
+                        file_path, sanitize=False, strictParsing=False)
+
+                    for counter, mol in enumerate(supplier, start=1):
+                        if mol is None or not mol.HasProp('SCORE'):
+                            continue
+
+                        score = float(mol.GetProp('SCORE'))
+                        writer.writerow((filename, counter, ligand, score))
 
         print(' - rDock data extraction completed.')
         print(' - Data saved in {}'.format(os.path.join(storage_path, output_file)))
@@ -585,14 +834,14 @@ class DockingAnalyzer:
         if self.protocol == 'dock':
 
             # Sorting data
-            df = pd.read_csv('3_docking_job/rDock_data.csv')
-            sorted_df = df.sort_values('rdock_score')
-            unique_df = sorted_df.drop_duplicates('ligand')
+            df = pd.read_csv('3_docking_job/rDock_data.csv', dtype=RDOCK_DATA_DTYPES)
+            unique_df = df.sort_values('rdock_score', kind='mergesort').drop_duplicates(
+                'ligand', keep='first')
             final_df = unique_df.sort_values('ligand')
 
             # Adding new column with conformer generated.
-            final_df['docking_conformation'] = final_df['file_entry'] - \
-                ((final_df['file_entry'] - 1) // 50) * 50
+            file_entry = final_df['file_entry'].to_numpy()
+            final_df['docking_conformation'] = ((file_entry - 1) % 50) + 1
 
             # Reorder the columns
             desired_order = ['ligand', 'conformer', 'docking_conformation',
@@ -607,7 +856,8 @@ class DockingAnalyzer:
 
         elif self.protocol == 'score':
 
-            df = pd.read_csv('3_docking_job/rDock_rescore_data.csv')
+            df = pd.read_csv(
+                '3_docking_job/rDock_rescore_data.csv', dtype=RDOCK_DATA_DTYPES)
             self.calculated_data = df
 
     def _correlation(self, experimental_data, column_name, protocol):
@@ -646,14 +896,28 @@ class DockingAnalyzer:
         elif self.docking_tool == 'glide':
             y = df_calculated.r_i_docking_score.to_numpy()
 
-        self._correlationPlotter(x, y, self.docking_tool, protocol)
-        self._doubleCorrelationPlotter(x, y, mw, self.docking_tool, protocol)
+        # Z-scores are shared by both plotters
+        z_x, z_y, z_mw = map(zscore, (x, y, mw))
+
+        # Files the plotted data comes from
+        sources = self._resultsFiles() + [experimental_data,
+                                          os.path.join('1_input_files/ligands/', self.ligands)]
 
-        print(' - Correlation image generated succesfully')
-        print(' - Molecular weight plots generated succesfully.')
+        if self._correlationPlotter(x, y, self.docking_tool, protocol,
+                                    z_x=z_x, z_y=z_y, sources=sources):
+            print(' - Correlation image generated succesfully')
+        else:
+            print(' - Correlation images are up to date (use force=True to generate them again).')
+
+        if self._doubleCorrelationPlotter(x, y, mw, self.docking_tool, protocol,
+                                          z_exp=z_x, z_cal=z_y, z_mw=z_mw, sources=sources):
+            print(' - Molecular weight plots generated succesfully.')
+        else:
+            print(' - Molecular weight plots are up to date (use force=True to generate them again).')
         print(' - Images stored at 3_docking_job/images\n')
 
-    def glideAnalysis(self, poses_per_ligand=1, column_name=None, experimental_data=None, protocol='dock', molecular_weight=True):
+    def glideAnalysis(self, poses_per_ligand=1, column_name=None, experimental_data=None, protocol='dock', molecular_weight=True,
+                      force=False):
         """
         Uses different hidden methods to retrieve all the data 
         from the glide docking simulation and generate an 
@@ -670,22 +934,35 @@ class DockingAnalyzer:
             Protocol used to obtain the results retrieved.
         molecular_weight : bool
             If True, the molecular weight of the ligands will be calculated.
+        force : bool
+            If True, molecular weights and images are generated again even if
+            they are up to date with the files and settings they come from.
         """
 
         self.protocol = protocol
+        self._force = force
+        self._settings = {'poses_per_ligand': poses_per_ligand, 'column_name': column_name,
+                          'experimental_data': experimental_data}
+        self._new_plot_settings = {}
+        self._png_pool = ThreadPoolExecutor(max_workers=2)
 
-        self._glideDockingResultsChecker(protocol)
-        self._glideDataFrameRetriever(protocol, poses_per_ligand)
+        try:
+            self._glideDockingResultsChecker(protocol)
+            self._glideDataFrameRetriever(protocol, poses_per_ligand)
 
-        if molecular_weight:
-            self._molecularWeightCalculator()
+            if molecular_weight:
+                self._molecularWeightCalculator()
 
-        if experimental_data is not None:
-            self._correlation(experimental_data, column_name, protocol)
+            if experimental_data is not None:
+                self._correlation(experimental_data, column_name, protocol)
+
+            self._glideTimePlotter()
+        finally:
+            self._waitPlots()
 
-        self._glideTimePlotter()
+        self._storePlotSettings()
 
-    def rdockAnalysis(self, experimental_data, column_name, protocol='dock'):
+    def rdockAnalysis(self, experimental_data, column_name, protocol='dock', force=False):
         """
         Uses different hidden methods to retrieve all the data 
         from the rdock docking simulation and generate an 
@@ -699,13 +976,26 @@ class DockingAnalyzer:
             Name of the column where the data in the csv is stored.
         protocol : str
             Protocol used to obtain the results retrieved.
+        force : bool
+            If True, molecular weights and images are generated again even if
+            they are up to date with the files and settings they come from.
         """
 
-        self._rdockDockingResultsChecker(protocol)
-        self._rdockDataFrameGenerator()
-        self._rdockDataFrameTrimmer()
-        self._molecularWeightCalculator()
-        self._correlation(experimental_data, column_name, protocol)
+        self._force = force
+        self._settings = {'column_name': column_name, 'experimental_data': experimental_data}
+        self._new_plot_settings = {}
+        self._png_pool = ThreadPoolExecutor(max_workers=2)
+
+        try:
+            self._rdockDockingResultsChecker(protocol)
+            self._rdockDataFrameGenerator()
+            self._rdockDataFrameTrimmer()
+            self._molecularWeightCalculator()
+            self._correlation(experimental_data, column_name, protocol)
+        finally:
+            self._waitPlots()
+
+        self._storePlotSettings()
 
     def rdockOutputToDataFrame(self, path_file, protocol='dock'):
         """
@@ -726,60 +1016,24 @@ class DockingAnalyzer:
             Dataframe with all the sdf annotations data.
         """
 
-        def extract_property(mol, prop, default=0):
-            """
-            Extracts a property value from a molecule and converts it to a float.
-
-            Parameters
-            ==========
-            mol : RDKit Mol object
-                The molecule from which the property will be extracted.
-            prop : str
-                The name of the property to extract from the molecule.
-            default : float, optional
-                The default value to return if the property is missing or cannot be
-                converted to a float. Default is 0.
-
-            Returns
-            =======
-            value : float
-                The extracted property value as a float. If the property is missing or
-                cannot be converted to a float, the default value is returned.
-            """
-            try:
-                return float(mol.GetProp(prop))
-            except:
-                return default
-
         # Reading SDF
         supplier = Chem.SDMolSupplier(path_file)
-        sdf_dict = {}
+        columns = ['Name', 'Conformer', *RDOCK_PROPERTIES]
+        indices = []
+        rows = []
 
         for cont, mol in enumerate(supplier):
-            mol_dict = {}
 
             if mol is not None:
                 # Extract properties from the molecule
                 molecule_name = mol.GetProp('Name') if protocol == 'dock' else mol.GetProp('Name').split('/')[-2]
                 molecule_conformer = mol.GetProp('s_lp_Variant') if protocol == 'dock' else '-'
 
-                properties = [
-                    'SCORE', 'SCORE.INTER', 'SCORE.INTER.CONST', 'SCORE.INTER.POLAR',
-                    'SCORE.INTER.REPUL', 'SCORE.INTER.ROT', 'SCORE.INTER.VDW',
-                    'SCORE.INTRA', 'SCORE.INTRA.DIHEDRAL', 'SCORE.INTRA.DIHEDRAL.0',
-                    'SCORE.INTRA.POLAR', 'SCORE.INTRA.POLAR.0', 'SCORE.INTRA.REPUL',
-                    'SCORE.INTRA.REPUL.0', 'SCORE.INTRA.VDW', 'SCORE.INTRA.VDW.0',
-                    'SCORE.SYSTEM', 'SCORE.SYSTEM.CONST', 'SCORE.SYSTEM.DIHEDRAL',
-                    'SCORE.SYSTEM.POLAR', 'SCORE.SYSTEM.REPUL', 'SCORE.SYSTEM.VDW'
-                ]
-
-                mol_dict.update({
-                    'Name': molecule_name,
-                    'Conformer': molecule_conformer,
-                    **{prop: extract_property(mol, prop) for prop in properties}
-                })
-
-                sdf_dict[cont] = mol_dict
-
-        df = pd.DataFrame.from_dict(sdf_dict, orient="index")
-        return df
\ No newline at end of file
+                props = mol.GetPropsAsDict()
+
+                indices.append(cont)
+                rows.append((molecule_name, molecule_conformer,
+                             *[float(props.get(prop, 0)) for prop in RDOCK_PROPERTIES]))
+
+        df = pd.DataFrame.from_records(rows, columns=columns, index=indices)
+        return df
@@ -2,11 +2,323 @@ from openbabel import pybel
 from Bio.PDB import PDBParser
 import os
 import shutil
+import subprocess
+import hashlib
+import mmap
+import re
+import string
+from concurrent.futures import ThreadPoolExecutor
 import MDAnalysis
 from openbabel import openbabel as ob
 import warnings
 warnings.filterwarnings('ignore')
 
+# $$$$ line closing an sdf record, and ligprep's variant name in a record
+SDF_TERMINATOR_PATTERN = re.compile(rb'^\$\$\$\$[^\n]*(?:\n|\Z)', re.M)
+SDF_VARIANT_PATTERN = re.compile(rb'<s_lp_Variant>[^\n]*\n([^\r\n]*)')
+
+# Static scripts written in the job folders
+SPLIT_MOLS_SCRIPT = (
+    '#!/bin/bash\n'
+    '#Usage: splitMols.sh <input> #Nfiles <outputRoot>\n'
+    'fname=$1\n'
+    'nfiles=$2\n'
+    'output=$3\n'
+    'molnum=$(grep -c \'$$$$\' $fname)\n'
+    'echo " - $molnum molecules found"\n'
+    'echo " - Dividing \'$fname\' into $nfiles files"\n'
+    'echo " "\n'
+    'rawstep=`echo $molnum/$nfiles | bc -l`\n'
+    'let step=$molnum/$nfiles\n'
+    'if [ ! `echo $rawstep%1 | bc` == 0 ]; then\n'
+    '        let step=$step+1;\n'
+    'fi;\n'
+    'sdsplit -$step -o$output $1\n'
+)
+
+RDOCK_GRID_SCRIPT = (
+    'module load rdock\n'
+    'rbcavity -was -d -r parameter_file.prm > parameter_file.log\n'
+)
+
+RDOCK_PREPARE_SCRIPT = (
+    '#!/bin/bash\n'
+    '# Run grid.sh\n\n'
+    'echo \' \'\n'
+    'echo \' - Generating grid and cavity\'\n'
+    'echo \' - Loading rDock module:\'\n'
+    'echo \' \'\n'
+    'source grid.sh\n'
+    'echo \' \'\n\n'
+    '# Run split.sh\n'
+    'echo \' - Splitting ligands\'\n'
+    'source split.sh\n'
+)
+
+RDOCK_SUBMIT_SCRIPT = (
+    '#!/bin/bash\n'
+    'sbatch run_array\n'
+)
+
+RDOCK_RUN_TEMPLATE = string.Template(
+    '#!/bin/sh\n'
+    '#SBATCH --job-name=rdock\n'
+    '#SBATCH --array=1-${cpus}\n'
+    '#SBATCH --time=${time}\n'
+    '#SBATCH --ntasks=1\n'
+    '#SBATCH --output=rdock.out\n'
+    '#SBATCH --error=rdock.err\n'
+    '#SBATCH --qos=${queue}\n'
+    '\n'
+    'module load rdock\n'
+    'module load ANACONDA/2019.10\n'
+    'module load intel\n'
+    'module load mkl\n'
+    'module load impi\n'
+    'module load gcc\n'
+    'module load boost/1.64.0\n'
+    '\n'
+    '${rbdock}'
+)
+
+EQUIBIND_RUN_SCRIPT = (
+    '#!/bin/bash\n'
+    '#SBATCH --job-name=equi\n'
+    '#SBATCH --time=1:00:00\n'
+    '#SBATCH --gres gpu:1\n'
+    '#SBATCH --cpus-per-task=40\n'
+    '#SBATCH --ntasks=1\n'
+    '#SBATCH --output=equi.out\n'
+    '#SBATCH --error=equi.err\n'
+    '\n'
+    'module purge\n'
+    'module load anaconda3/2020.02\n'
+    'module list\n'
+    '\n'
+    'eval "$(conda shell.bash hook)"\n'
+    'conda activate /apps/ANACONDA3/2020.02/envs/ESM-EquiBind-DiffDock\n'
+    '\n'
+    'cp -r /gpfs/apps/POWER9/ANACONDA3/2020.02/envs/ESM-EquiBind-DiffDock/modules/EquiBind/runs .\n'
+    'python /gpfs/apps/POWER9/ANACONDA3/2020.02/envs/ESM-EquiBind-DiffDock/modules/EquiBind/inference.py --config=inference.yml\n'
+)
+
+EQUIBIND_INFERENCE_YML = (
+    'run_dirs:\n'
+    '  - flexible_self_docking # the resulting coordinates will be saved here as tensors in a .pt file (but also as .sdf files if you specify an "output_directory" below)\n'
+    'inference_path: \'equibind_calculations\' # this should be your input file path as described in the main readme\n'
+    '\n'
+    'test_names: timesplit_test\n'
+    'output_directory: \'equibind_results\' # the predicted ligands will be saved as .sdf file here\n'
+    'run_corrections: True\n'
+    'use_rdkit_coords: False # generates the coordinates of the ligand with rdkit instead of using the provided conformer. If you already have a 3D structure that you want to use as initial conformer, then leave this as False\n'
+    'save_trajectories: False\n'
+    '\n'
+    'num_confs: 1 # usually this should be 1\n'
+)
+
+
+def first_file(path, extension=''):
+    """
+    Finds the first file in a directory with a certain extension. 
+    The scan stops at the first match.
+
+    Parameters
+    ==========
+    path : str
+        Directory to look into.
+    extension : str
+        Ending the file name should have.
+
+    Returns
+    =======
+    file_name : str
+        Name of the first file found or None if there is none.
+    """
+
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_file(follow_symlinks=False) and entry.name.endswith(extension):
+                return entry.name
+
+    return None
+
+
+def write_file(path, content):
+    """
+    Writes a text file, creating its folder if needed.
+
+    Parameters
+    ==========
+    path : str
+        Path of the file to write.
+    content : str
+        Content of the file.
+    """
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    with open(path, 'w') as fileout:
+        fileout.write(content)
+
+
+def link_or_copy(src, dst):
+    """
+    Hard links a file into a new location, falling back to an in-kernel
+    copy when linking is not possible (e.g. different file systems). Only 
+    meant for input files that are read but never modified.
+
+    Parameters
+    ==========
+    src : str
+        Path of the file to link.
+    dst : str
+        Destination path or folder.
+    """
+
+    if os.path.isdir(dst):
+        dst = os.path.join(dst, os.path.basename(src))
+
+    if os.path.exists(dst):
+        if os.path.samefile(src, dst):
+            return
+        os.remove(dst)
+
+    try:
+        os.link(src, dst)
+        return
+    except OSError:
+        pass
+
+    # Copy without passing the data through user space when supported
+    if hasattr(os, 'copy_file_range'):
+        try:
+            with open(src, 'rb') as filein, open(dst, 'wb') as fileout:
+                remaining = os.fstat(filein.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(filein.fileno(), fileout.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+
+            if remaining == 0:
+                shutil.copymode(src, dst)
+                return
+        except OSError:
+            pass
+
+    shutil.copy(src, dst)
+
+
+def obabel_convert(file_in, format_in, file_out, format_out):
+    """
+    Converts the first molecule of a file with the obabel binary, which
+    avoids going atom by atom through the Python bindings.
+
+    Parameters
+    ==========
+    file_in : str
+        Path of the file to convert.
+    format_in : str
+        Format of the input file.
+    file_out : str
+        Path of the converted file.
+    format_out : str
+        Format we want to convert to.
+
+    Returns
+    =======
+    converted : bool
+        False if obabel is not installed and nothing has been done.
+    """
+
+    if shutil.which('obabel') is None:
+        return False
+
+    subprocess.run(['obabel', '-i' + format_in, file_in, '-o' + format_out,
+                    '-O', file_out, '-l', '1'],
+                   check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+    return True
+
+
+def count_molecules(path):
+    """
+    Counts the molecules of an sdf file by counting its $$$$ 
+    separators over a memory map of the file.
+
+    Parameters
+    ==========
+    path : str
+        Path of the sdf file.
+
+    Returns
+    =======
+    molecules : int
+        Number of molecules in the file.
+    """
+
+    if os.path.getsize(path) == 0:
+        return 0
+
+    molecules = 0
+
+    with open(path, 'rb') as filein, mmap.mmap(filein.fileno(), 0, access=mmap.ACCESS_READ) as content:
+        position = content.find(b'$$$$')
+        while position != -1:
+            molecules += 1
+            position = content.find(b'$$$$', position + 4)
+
+    return molecules
+
+
+def sdf_digest(path):
+    """
+    Computes a blake2b digest of a file reading it in
+    chunks of 1 MB.
+
+    Parameters
+    ==========
+    path : str
+        Path of the file.
+
+    Returns
+    =======
+    digest : str
+        Hexadecimal digest of the file's content.
+    """
+
+    digest = hashlib.blake2b(digest_size=16)
+
+    with open(path, 'rb') as filein:
+        for chunk in iter(lambda: filein.read(1 << 20), b''):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def write_if_changed(path, content):
+    """
+    Writes a text file unless it already exists with the same content,
+    avoiding needless writes when a job is prepared again.
+
+    Parameters
+    ==========
+    path : str
+        Path of the file to write.
+    content : str
+        Content of the file.
+    """
+
+    data = content.encode()
+
+    if os.path.isfile(path) and os.path.getsize(path) == len(data):
+        with open(path, 'rb') as filein:
+            if filein.read() == data:
+                return
+
+    with open(path, 'wb') as fileout:
+        fileout.write(data)
+
 
 class DockingJob:
     """
@@ -56,6 +368,8 @@ class DockingJob:
     _rdockRescorePreparation(self, complete_structure)
         Prepare the files to launch an rdock rescore 
         simulation.
+    _receptorConverter(self, receptor, format_out, path_out)
+        Write the receptor in another format parsing it only once.
     _rdockReceptorFormatChecker(self, receptor)
         Check receptor's file format and change it to mol2.
     _rdockFileCopier(self, reference_ligand)
@@ -68,7 +382,7 @@ class DockingJob:
     _rdockJobSplitter(self, ligands, cpus_docking)
         Split the total number of molecules into number of cpus available.
     _rdockRunFilesGenerator(self, cpus_docking)
-        Generate all the necessary run files.
+        Generate the job array run file and the scripts to send it.
     _equibindReceptorFormatChecker(self, receptor)
         Check if formats for equibind docking are correct.
     _equibindSplitLigands(self, ligands)
@@ -79,45 +393,53 @@ class DockingJob:
         Writing necessary inference.yml and run files.
     """
 
-    def __init__(self):
+    def __init__(self, receptor=None, ligands=None):
         """
         Prepare files and folders coming from the liprep job in a 
         directory to perform  acertain kind of docking.
+
+        Parameters
+        ==========
+        receptor : str
+            Name of the receptor's file in 1_input_files/receptor/. If None,
+            the first file found there is used.
+        ligands : str
+            Name of the ligprep's output in 2_ligprep_job/job/. If None, the 
+            first sdf file found there is used.
         """
 
         self.prepared_ligands = False
 
-        if os.path.isdir('1_input_files/receptor/'):
-            receptor = '1_input_files/receptor/' + \
-                os.listdir('1_input_files/receptor/')[0]
-        else:
+        if receptor is None and os.path.isdir('1_input_files/receptor/'):
+            receptor = first_file('1_input_files/receptor/')
+
+        if receptor is None:
             raise Exception(
                 'MissingReceptorFile: Receptor file should be located at \'1_input_files/receptor/\'')
 
-        if os.path.isdir('2_ligprep_job/job/'):
-            ligands = '2_ligprep_job/job/' + \
-                [x for x in os.listdir('2_ligprep_job/job/')
-                 if x.endswith('.sdf')][0]
-            
-        elif os.path.isdir('1_input_files/ligands'):
+        if ligands is None and os.path.isdir('2_ligprep_job/job/'):
+            ligands = first_file('2_ligprep_job/job/', '.sdf')
+
+        if ligands is None and os.path.isdir('1_input_files/ligands'):
             files = os.listdir('1_input_files/ligands')
             if len(files) == 1 and files[0].split('.')[1] == 'sdf':
                 ligands = '1_input_files/ligands/' + files[0]
                 self.prepared_ligands = True
                 print(' -     The prepared ligands are already prepared and in sdf format.') 
 
-
-        else:
+        if ligands is None:
             raise Exception(
                 'MissingLigandsFile: Ligands file should be located at \'2_ligprep_job/job/\'')
 
-        self.receptor = receptor.split('/')[-1]
-        self.ligands = ligands.split('/')[-1]
+        self.receptor = os.path.basename(receptor)
+        self.ligands = os.path.basename(ligands)
         self.docking_tool = None
         self.grid_file = None
         self.reference_ligand = None
         self.ligand_score = None
         self.output_models = None
+        self._receptor_molecules = {}
+        self._converted_receptors = set()
 
         self._ligandsChecker(ligands)
         self._folderPreparation()
@@ -129,12 +451,10 @@ class DockingJob:
         Parameters
         ==========
         ligands : str
-            Name of the csv file with SMILES and id.
+            Name of the ligprep's output sdf file.
         """
 
-        if (ligands.split('.')[-1] != 'sdf') or (ligands.split('.')[-1] != 'sd'):
-            pass
-        else:
+        if os.path.splitext(ligands)[1].lower() not in ('.sdf', '.sd'):
             raise Exception(
                 'LigandsFileError: The ligands file shoud be the output from ligprep in sdf format.')
 
@@ -178,13 +498,14 @@ class DockingJob:
         glide_score_path = '3_docking_job/glide_score'
         grid_file_name = os.path.basename(grid_file)
 
+        # Grid and ligands are only read by Glide, so they are linked instead of copied
         if protocol == 'dock':
-            shutil.copy(grid_file, docking_job_path)
+            link_or_copy(grid_file, docking_job_path)
 
             if not self.prepared_ligands:
-                shutil.copy(ligprep_path + self.ligands, docking_job_path)
+                link_or_copy(ligprep_path + self.ligands, docking_job_path)
             else:
-                shutil.copy(input_ligand_path + self.ligands, docking_job_path)
+                link_or_copy(input_ligand_path + self.ligands, docking_job_path)
 
             grid_path = os.path.join(
                 docking_job_path, 'glide_job.sh')
@@ -202,47 +523,39 @@ class DockingJob:
             if not os.path.isdir(ligand_score_path):
                 os.mkdir(ligand_score_path)
 
-            shutil.copy(grid_file, ligand_score_path)
+            link_or_copy(grid_file, ligand_score_path)
 
             grid_path = os.path.join(
                 ligand_score_path, 'glide_score.sh')
             job_path = os.path.join(
                 ligand_score_path, 'glide_score.in')
 
+        job_content = 'GRIDFILE   {}\nPRECISION   SP\n'.format(grid_file_name)
+
+        if protocol == 'dock':
+            run_content = '"${SCHRODINGER}/glide" glide_job.in -OVERWRITE -adjust -HOST localhost:1 -TMPLAUNCHDIR'
+            job_content += (
+                'LIGANDFILE   {ligands}\n'
+                'FORCEFIELD   {ff}\n'
+                'POSES_PER_LIG   {models}\n'
+                'POSTDOCK_NPOSE   {models}\n').format(
+                    ligands=self.ligands, ff=forcefield, models=output_model)
+
+        elif protocol == 'score':
+            run_content = '"${SCHRODINGER}/glide" glide_score.in -OVERWRITE -adjust -HOST localhost:1 -TMPLAUNCHDIR'
+            job_content += (
+                'LIGANDFILE   {}\n'
+                'DOCKING_METHOD   inplace\n'
+                'POSTDOCK   False\n').format(os.path.basename(self.ligand_score))
+
         with open(grid_path, 'w') as filein:
-            if protocol == 'dock':
-                filein.writelines(
-                    '"${SCHRODINGER}/glide" glide_job.in -OVERWRITE -adjust -HOST localhost:1 -TMPLAUNCHDIR'
-                )
-            elif protocol == 'score':
-                filein.writelines(
-                    '"${SCHRODINGER}/glide" glide_score.in -OVERWRITE -adjust -HOST localhost:1 -TMPLAUNCHDIR'
-                )
+            filein.write(run_content)
 
         with open(job_path, 'w') as filein:
-            filein.writelines([
-                'GRIDFILE   {}\n'.format(grid_file_name),
-                'PRECISION   SP\n'
-            ])
-
-            if protocol == 'dock':
-                filein.writelines([
-                    'LIGANDFILE   {}\n'.format(self.ligands),
-                    'FORCEFIELD   {}\n'.format(forcefield),
-                    'POSES_PER_LIG   {}\n'.format(output_model),
-                    'POSTDOCK_NPOSE   {}\n'.format(output_model)
-                ])
-
-            if protocol == 'score':
-                filein.writelines([
-                    'LIGANDFILE   {}\n'.format(
-                        os.path.basename(self.ligand_score)),
-                    'DOCKING_METHOD   inplace\n',
-                    'POSTDOCK   False\n'
-                ])
+            filein.write(job_content)
 
         if protocol == 'score':
-            shutil.copy(self.ligand_score, ligand_score_path)
+            link_or_copy(self.ligand_score, ligand_score_path)
 
         print(' - Glide job generated successfully with grid {grid} and forcefield {ff}.'.format(
             grid=grid_file, ff=forcefield))
@@ -314,13 +627,17 @@ class DockingJob:
 
             file = os.path.basename(file_in)
             file_name, file_format = file.split('.')
+            file_out = os.path.join(
+                path_out, '{name}.{format}'.format(name=file_name, format=format_out))
+
+            if obabel_convert(file_in, file_format, file_out, format_out):
+                return
 
             conv = ob.OBConversion()
             conv.SetInAndOutFormats(file_format, format_out)
             mol = ob.OBMol()
             conv.ReadFile(mol, file_in)
-            conv.WriteFile(mol, os.path.join(
-                path_out, '{name}.{format}'.format(name=file_name, format=format_out)))
+            conv.WriteFile(mol, file_out)
 
         rdock_path = '3_docking_job/rdock_score'
 
@@ -357,6 +674,41 @@ class DockingJob:
 
         self.ligand_score = file_structure
 
+    def _receptorConverter(self, receptor, format_out, path_out):
+        """
+        Writes the receptor in another format with the obabel binary 
+        or, if it is not installed, with pybel parsing the receptor only
+        once per object. A conversion already done is not repeated, so 
+        setting up several docking tools on the same receptor does 
+        not read it again.
+
+        Parameters
+        ==========
+        receptor : str
+            File name of the receptor in 1_input_files/receptor/.
+        format_out : str
+            Format we want to convert to.
+        path_out : str
+            Path of the converted file.
+        """
+
+        if path_out in self._converted_receptors and os.path.isfile(path_out):
+            return
+
+        path_receptor = '1_input_files/receptor/' + receptor
+        receptor_format = receptor.split('.')[-1]
+
+        # Python bindings only used when the obabel binary is missing
+        if not obabel_convert(path_receptor, receptor_format, path_out, format_out):
+            if path_receptor not in self._receptor_molecules:
+                self._receptor_molecules[path_receptor] = next(
+                    pybel.readfile(receptor_format, path_receptor))
+
+            self._receptor_molecules[path_receptor].write(
+                format_out, path_out, overwrite=True)
+
+        self._converted_receptors.add(path_out)
+
     def _rdockReceptorFormatChecker(self, receptor):
         """
         Check receptor's format and transform it if necessary to mol2.
@@ -377,11 +729,8 @@ class DockingJob:
         if receptor_format != 'mol2':
 
             print(' - Changing receptor\'s format to mol2.')
-            receptor_generator = pybel.readfile(
-                receptor_format, '1_input_files/receptor/' + receptor)
-            receptor_molecule = next(receptor_generator)
-            receptor_molecule.write(
-                "mol2", "3_docking_job/job/{}.mol2".format(receptor_name), overwrite=True)
+            self._receptorConverter(
+                receptor, 'mol2', '3_docking_job/job/{}.mol2'.format(receptor_name))
 
         else:
             pass
@@ -397,26 +746,36 @@ class DockingJob:
             and grid for rDock.
         """
 
-        reference_ligand_name = os.path.basename(reference_ligand)
+        def reference_ligand_copier():
+            """
+            Place the reference ligand in the inputs and job folders.
+            """
 
-        if os.path.isfile(reference_ligand):
-            shutil.copy(reference_ligand, os.path.join(
-                '1_input_files/ligands', reference_ligand_name))
-            shutil.move(reference_ligand, os.path.join(
-                '3_docking_job/job', reference_ligand_name))
-        elif not os.path.isfile(reference_ligand):
-            if os.path.isfile(os.path.join('3_docking_job/job', reference_ligand_name)):
-                pass
-            elif os.path.isfile(os.path.join('1_input_files/ligands', reference_ligand_name)):
-                shutil.copy(os.path.join('1_input_files/ligands', reference_ligand_name), os.path.join(
-                '3_docking_job/job', reference_ligand_name))
-            else:
-                raise Exception(
-                    'ReferenceLigandError: Tha path is not correct and it has not been found in 3_docking_job/job.')
+            reference_ligand_name = os.path.basename(reference_ligand)
+
+            if os.path.isfile(reference_ligand):
+                link_or_copy(reference_ligand, os.path.join(
+                    '1_input_files/ligands', reference_ligand_name))
+                shutil.move(reference_ligand, os.path.join(
+                    '3_docking_job/job', reference_ligand_name))
+            elif not os.path.isfile(reference_ligand):
+                if os.path.isfile(os.path.join('3_docking_job/job', reference_ligand_name)):
+                    pass
+                elif os.path.isfile(os.path.join('1_input_files/ligands', reference_ligand_name)):
+                    link_or_copy(os.path.join('1_input_files/ligands', reference_ligand_name), os.path.join(
+                    '3_docking_job/job', reference_ligand_name))
+                else:
+                    raise Exception(
+                        'ReferenceLigandError: Tha path is not correct and it has not been found in 3_docking_job/job.')
+
+        # The three copies are independent of each other
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            copies = [executor.submit(reference_ligand_copier),
+                      executor.submit(link_or_copy, '2_ligprep_job/job/' + self.ligands, '3_docking_job/job'),
+                      executor.submit(link_or_copy, '1_input_files/receptor/' + self.receptor, '3_docking_job/job')]
 
-        shutil.copy('2_ligprep_job/job/' + self.ligands, '3_docking_job/job')
-        shutil.copy('1_input_files/receptor/' +
-                    self.receptor, '3_docking_job/job')
+        for copy in copies:
+            copy.result()
 
     def _rdockParamFilesWriter(self, receptor, reference_ligand, protocol):
         """
@@ -448,7 +807,7 @@ class DockingJob:
             
         if not os.path.isfile(parameter_file):
             with open(parameter_file, 'w') as fileout:
-                fileout.writelines(
+                fileout.write(
                     'RBT_PARAMETER_FILE_V1.00\n'
                     'TITLE rdock\n'
                     '\n'
@@ -487,18 +846,11 @@ class DockingJob:
             Name of the protocol used to score the ligand(s).
         """
         if protocol == 'dock':
-            with open('3_docking_job/job/grid.sh', 'w') as fileout:
-                fileout.writelines(
-                    'module load rdock\n'
-                    'rbcavity -was -d -r parameter_file.prm > parameter_file.log\n'
-                )
+            write_if_changed('3_docking_job/job/grid.sh', RDOCK_GRID_SCRIPT)
 
         elif protocol == 'score':
-            with open('3_docking_job/rdock_score/{}/grid.sh'.format(self.ligand_score), 'w') as fileout:
-                fileout.writelines(
-                    'module load rdock\n'
-                    'rbcavity -was -d -r parameter_file.prm > parameter_file.log\n'
-                )
+            write_if_changed('3_docking_job/rdock_score/{}/grid.sh'.format(self.ligand_score),
+                             RDOCK_GRID_SCRIPT)
 
     def _rdockJobSplitter(self, ligands, cpus_docking, protocol):
         """
@@ -518,73 +870,44 @@ class DockingJob:
             ligands_file=ligands, cpus=cpus_docking))
 
         if protocol == 'dock':
+            path_job = '3_docking_job/job'
+            output = 'ligands/split'
 
-            # Generating split file
-            if not os.path.isfile('3_docking_job/job/splitMols.sh'):
-                with open('3_docking_job/job/splitMols.sh', 'w') as filein:
-                    filein.writelines(
-                        '#!/bin/bash\n'
-                        '#Usage: splitMols.sh <input> #Nfiles <outputRoot>\n'
-                        'fname=$1\n'
-                        'nfiles=$2\n'
-                        'output=$3\n'
-                        'molnum=$(grep -c \'$$$$\' $fname)\n'
-                        'echo " - $molnum molecules found"\n'
-                        'echo " - Dividing \'$fname\' into $nfiles files"\n'
-                        'echo " "\n'
-                        'rawstep=`echo $molnum/$nfiles | bc -l`\n'
-                        'let step=$molnum/$nfiles\n'
-                        'if [ ! `echo $rawstep%1 | bc` == 0 ]; then\n'
-                        '        let step=$step+1;\n'
-                        'fi;\n'
-                        'sdsplit -$step -o$output $1\n'
-                    )
-
-            # Generating splitted ligand files
-            with open('3_docking_job/job/split.sh', 'w') as fileout:
-                fileout.writelines(
-                    'bash splitMols.sh {ligands_file} {cpus} ligands/split\n'.format(
-                        ligands_file=ligands, cpus=cpus_docking)
-                )
+        elif protocol == 'score':
+            path_job = '3_docking_job/rdock_score/{}'.format(self.ligand_score)
+            output = 'split'
 
-        if protocol == 'score':
+        path_ligands = os.path.join(path_job, ligands)
 
-            path_splitMols = '3_docking_job/rdock_score/{}/splitMols.sh'.format(self.ligand_score)
-            path_split = '3_docking_job/rdock_score/{}/split.sh'.format(self.ligand_score)
-
-            if not os.path.isfile(path_splitMols):
-                with open(path_splitMols, 'w') as filein:
-
-                    filein.writelines(
-                        '#!/bin/bash\n'
-                        '#Usage: splitMols.sh <input> #Nfiles <outputRoot>\n'
-                        'fname=$1\n'
-                        'nfiles=$2\n'
-                        'output=$3\n'
-                        'molnum=$(grep -c \'$$$$\' $fname)\n'
-                        'echo " - $molnum molecules found"\n'
-                        'echo " - Dividing \'$fname\' into $nfiles files"\n'
-                        'echo " "\n'
-                        'rawstep=`echo $molnum/$nfiles | bc -l`\n'
-                        'let step=$molnum/$nfiles\n'
-                        'if [ ! `echo $rawstep%1 | bc` == 0 ]; then\n'
-                        '        let step=$step+1;\n'
-                        'fi;\n'
-                        'sdsplit -$step -o$output $1\n'
-                    )
-
-            # Generating splitted ligand files
-                with open(path_split, 'w') as fileout:
-                    fileout.writelines(
-                        'bash splitMols.sh {ligands_file} {cpus} split\n'.format(
-                            ligands_file=ligands, cpus=cpus_docking)
-                    )
+        if os.path.isfile(path_ligands):
+            # Molecules per file computed now instead of in the shell script
+            molecules = count_molecules(path_ligands)
+            step = max(1, -(-molecules // cpus_docking))
+
+            print(' - {} molecules found, {} per file.'.format(molecules, step))
+
+            split_content = 'sdsplit -{step} -o{output} {ligands_file}\n'.format(
+                step=step, output=output, ligands_file=ligands)
+
+        else:
+            # Ligands not in place yet: the step is computed when splitting
+            path_split_mols = os.path.join(path_job, 'splitMols.sh')
+
+            if not os.path.isfile(path_split_mols):
+                with open(path_split_mols, 'w') as fileout:
+                    fileout.write(SPLIT_MOLS_SCRIPT)
+
+            split_content = 'bash splitMols.sh {ligands_file} {cpus} {output}\n'.format(
+                ligands_file=ligands, cpus=cpus_docking, output=output)
+
+        # Generating splitted ligand files
+        write_if_changed(os.path.join(path_job, 'split.sh'), split_content)
 
     def _rdockRunFilesGenerator(self, cpus_docking, protocol, output_models, queue, time):
         """
-        Generate all the necessary runs to run an individual
-        rDock simulation, to prepare the rDock simulation, and 
-        to run all the individual simulations. 
+        Generate a job array run file with one rDock simulation
+        per cpu, the script to prepare the rDock simulation, and 
+        the script to send the job array. 
 
         Parameters
         ==========
@@ -607,96 +930,21 @@ class DockingJob:
             os.mkdir('3_docking_job/job/results')
 
         if protocol == 'dock':
-            # Generating run files
-            for i in range(1, cpus_docking+1):
-                with open('3_docking_job/job/run{}'.format(i), 'w') as fileout:
-                    fileout.writelines(
-                        '#!/bin/sh\n'
-                        '#SBATCH --job-name=rdock' + str(i) + ' \n'
-                        '#SBATCH --time=' + time + '\n'
-                        '#SBATCH --ntasks=1\n'
-                        '#SBATCH --output=rdock.out\n'
-                        '#SBATCH --error=rdock.err\n'
-                        '#SBATCH --qos=' + queue + '\n'
-                        '\n'
-                        'module load rdock\n'
-                        'module load ANACONDA/2019.10\n'
-                        'module load intel\n'
-                        'module load mkl\n'
-                        'module load impi\n'
-                        'module load gcc\n'
-                        'module load boost/1.64.0\n'
-                        '\n'
-                        'rbdock -i ligands/split{val}.sd -o results/split{val}_out -r parameter_file.prm -p dock.prm -n {out} -allH\n'.format(
-                            val=i, out=output_models))
-
-            with open('3_docking_job/job/prepare_rDock_run.sh', 'w') as fileout:
-                fileout.writelines(
-                    '#!/bin/bash\n'
-                    '# Run grid.sh\n\n'
-                    'echo \' \'\n'
-                    'echo \' - Generating grid and cavity\'\n'
-                    'echo \' - Loading rDock module:\'\n'
-                    'echo \' \'\n'
-                    'source grid.sh\n'
-                    'echo \' \'\n\n'
-                    '# Run split.sh\n'
-                    'echo \' - Splitting ligands\'\n'
-                    'source split.sh\n'
-                )
-
-            with open('3_docking_job/job/rDock_run.sh', 'w') as fileout:
-                fileout.writelines(
-                    '#!/bin/bash\n'
-                    'for d in run*; do echo ${d}; sbatch ${d}; done'
-                )
+            path_job = '3_docking_job/job'
+            rbdock = 'rbdock -i ligands/split${{SLURM_ARRAY_TASK_ID}}.sd -o results/split${{SLURM_ARRAY_TASK_ID}}_out -r parameter_file.prm -p dock.prm -n {out} -allH\n'.format(
+                out=output_models)
 
         elif protocol == 'score':
-            # Generating run files
-            for i in range(1, cpus_docking+1):
-                with open('3_docking_job/rdock_score/{}/run{}'.format(self.ligand_score,i), 'w') as fileout:
-                    fileout.writelines(
-                        '#!/bin/sh\n'
-                        '#SBATCH --job-name=rdock' + str(i) + ' \n'
-                        '#SBATCH --time=' + time + '\n'
-                        '#SBATCH --ntasks=1\n'
-                        '#SBATCH --output=rdock.out\n'
-                        '#SBATCH --error=rdock.err\n'
-                        '#SBATCH --qos=' + queue + '\n'
-                        '\n'
-                        'module load rdock\n'
-                        'module load ANACONDA/2019.10\n'
-                        'module load intel\n'
-                        'module load mkl\n'
-                        'module load impi\n'
-                        'module load gcc\n'
-                        'module load boost/1.64.0\n'
-                        '\n'
-                        '\n'
-                        'rbdock -i ligand.sdf -o ligand_out -r parameter_file.prm -p score.prm -allH\n'.format(
-                            val=i)
-                    )
-
-            with open('3_docking_job/rdock_score/{}/prepare_rDock_run.sh'.format(self.ligand_score), 'w') as fileout:
-                fileout.writelines(
-                    '#!/bin/bash\n'
-                    '# Run grid.sh\n\n'
-                    'echo \' \'\n'
-                    'echo \' - Generating grid and cavity\'\n'
-                    'echo \' - Loading rDock module:\'\n'
-                    'echo \' \'\n'
-                    'source grid.sh\n'
-                    'echo \' \'\n\n'
-                    '# Run split.sh\n'
-                    'echo \' - Splitting ligands\'\n'
-                    'source split.sh\n'
-                )
-
-            with open('3_docking_job/rdock_score/{}/rDock_run.sh'.format(self.ligand_score), 'w') as fileout:
-                fileout.writelines(
-                    '#!/bin/bash\n'
-                    'for d in run*; do echo ${d}; sbatch ${d}; done'
-                )
+            path_job = '3_docking_job/rdock_score/{}'.format(self.ligand_score)
+            rbdock = '\nrbdock -i ligand.sdf -o ligand_out -r parameter_file.prm -p score.prm -allH\n'
+
+        # Generating a single job array run file, one task per cpu
+        write_if_changed(os.path.join(path_job, 'run_array'),
+                         RDOCK_RUN_TEMPLATE.substitute(cpus=cpus_docking, time=time,
+                                                       queue=queue, rbdock=rbdock))
+
+        write_if_changed(os.path.join(path_job, 'prepare_rDock_run.sh'), RDOCK_PREPARE_SCRIPT)
+        write_if_changed(os.path.join(path_job, 'rDock_run.sh'), RDOCK_SUBMIT_SCRIPT)
 
         print(' - Job generated to be sent to MN4 machine.')
         print(' - RDock docking job generated successfully to run with {} cpu(s).'.format(cpus_docking))
@@ -722,11 +970,8 @@ class DockingJob:
         if receptor_format != 'pdb':
             print(' - Changing receptor\'s format to pdb.')
 
-            receptor_generator = pybel.readfile(
-                receptor_format, '1_input_files/receptor/' + receptor)
-            receptor_molecule = next(receptor_generator)
-            receptor_molecule.write(
-                "pdb", "3_docking_job/{}.pdb".format(receptor_name), overwrite=True)
+            self._receptorConverter(
+                receptor, 'pdb', '3_docking_job/{}.pdb'.format(receptor_name))
 
         else:
             shutil.copy('1_input_files/receptor/' + receptor, '3_docking_job')
@@ -742,41 +987,79 @@ class DockingJob:
             File name of the ligprep's output.
         """
 
-        with open('2_ligprep_job/job/{}'.format(ligands), 'r') as f:
-            content = f.read().strip()
-
-        records = content.split('$$$$')
-
-        for record in records:
-            if record.strip():
-
-                # Extract the value of the property for naming the output file
-                variant_value = None
-                lines = record.split('\n')
-                for line in lines:
-                    if '<s_lp_Variant>' in line:
-                        variant_value = lines[lines.index(line) + 1]
-                        break
-
-                if variant_value:
-                    output_file = variant_value + '.sdf'
-
-                    if not os.path.isdir('3_docking_job/job/equibind_calculations'):
-                        os.mkdir('3_docking_job/job/equibind_calculations')
-
-                    if not os.path.isdir('3_docking_job/job/equibind_results'):
-                        os.mkdir('3_docking_job/job/equibind_results')
-
-                    if not os.path.isdir('3_docking_job/job/equibind_calculations/{}'.format(variant_value)):
-                        os.mkdir(
-                            '3_docking_job/job/equibind_calculations/{}'.format(variant_value))
+        def write_record(record):
+            """
+            Sends a single sdf record to be written in its own folder 
+            named after its ligprep variant.
 
-                    # Write the record to the output file
-                    with open('3_docking_job/job/equibind_calculations/{folder}/{output}'.format(folder=variant_value, output=output_file), 'w') as f:
-                        if record.startswith('\n'):
-                            record = record[1:]
+            Parameters
+            ==========
+            record : bytes
+                Content of the record, without its $$$$ line.
+            """
 
-                        f.write(record + '$$$$')
+            # Extract the value of the property for naming the output file
+            variant = SDF_VARIANT_PATTERN.search(record)
+
+            if variant and variant.group(1):
+                variant_value = variant.group(1).decode()
+                output_path = '3_docking_job/job/equibind_calculations/{folder}/{output}'.format(
+                    folder=variant_value, output=variant_value + '.sdf')
+
+                # Repeated variants are written in the order they appear
+                if output_path in writes:
+                    writes[output_path].result()
+
+                writes[output_path] = executor.submit(
+                    write_file, output_path, record.decode() + '$$$$')
+
+        os.makedirs('3_docking_job/job/equibind_calculations', exist_ok=True)
+        os.makedirs('3_docking_job/job/equibind_results', exist_ok=True)
+
+        path_ligands = '2_ligprep_job/job/{}'.format(ligands)
+        path_cache_key = '3_docking_job/job/.equibind_split_key'
+        writes = {}
+
+        # Skip the split if these same ligands were already split and all 
+        # the split files, renamed or not by the folder preparation, are still there
+        cache_key = sdf_digest(path_ligands)
+
+        if os.path.isfile(path_cache_key):
+            with open(path_cache_key, 'r') as filein:
+                digest, *variants = filein.read().splitlines()
+
+            if digest == cache_key and all(
+                    os.path.isfile('3_docking_job/job/equibind_calculations/{name}/{name}.sdf'.format(name=variant)) or
+                    os.path.isfile('3_docking_job/job/equibind_calculations/{name}/{name}_ligand.sdf'.format(name=variant))
+                    for variant in variants):
+                print(' - Ligands already split, skipping the split.')
+                return
+
+        if os.path.getsize(path_ligands) == 0:
+            return
+
+        # Records are matched in place over a memory map of the file and
+        # written concurrently, since each write is dominated by file system latency
+        with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as executor, \
+                open(path_ligands, 'rb') as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as content:
+            end = 0
+            for match in SDF_TERMINATOR_PATTERN.finditer(content):
+                record = content[end:match.start()]
+                if record.strip():
+                    write_record(record)
+                end = match.end()
+
+            # Last record without $$$$ termination
+            if content[end:].strip():
+                write_record(content[end:].rstrip())
+
+        for future in writes.values():
+            future.result()
+
+        # Digest of the input followed by the variants it was split into
+        write_file(path_cache_key, '\n'.join(
+            [cache_key] + [os.path.basename(os.path.dirname(path)) for path in writes]))
 
     def _equibindFolderPreparation(self, receptor):
         """
@@ -788,20 +1071,28 @@ class DockingJob:
             File name of the receptor.
         """
 
-        for folder in os.listdir('3_docking_job/job/equibind_calculations'):
-            folder_path = os.path.join(
-                '3_docking_job/job/equibind_calculations', folder)
+        # Entry types come with the directory listing, without an extra stat
+        with os.scandir('3_docking_job/job/equibind_calculations') as entries:
+            for entry in entries:
+                if not entry.is_dir(follow_symlinks=False):
+                    continue
+
+                folder = entry.name
+                folder_path = entry.path
 
-            if os.path.isdir(folder_path):
                 destination_protein = os.path.join(
                     folder_path, folder + "_protein.pdb")
                 destination_ligands = os.path.join(
                     folder_path, folder + "_ligand.sdf")
 
-                shutil.copyfile(
+                source_ligands = os.path.join(folder_path, folder + '.sdf')
+
+                link_or_copy(
                     '3_docking_job/{}'.format(receptor), destination_protein)
-                os.rename('3_docking_job/job/equibind_calculations/{name}/{name}.sdf'.format(
-                    name=folder), destination_ligands)
+
+                # Already renamed if the split was skipped
+                if os.path.isfile(source_ligands):
+                    os.rename(source_ligands, destination_ligands)
 
     def _equibindFilesPreparation(self):
         """
@@ -810,41 +1101,10 @@ class DockingJob:
         """
 
         with open('3_docking_job/job/run', 'w') as fileout:
-            fileout.writelines(
-                '#!/bin/bash\n'
-                '#SBATCH --job-name=equi\n'
-                '#SBATCH --time=1:00:00\n'
-                '#SBATCH --gres gpu:1\n'
-                '#SBATCH --cpus-per-task=40\n'
-                '#SBATCH --ntasks=1\n'
-                '#SBATCH --output=equi.out\n'
-                '#SBATCH --error=equi.err\n'
-                '\n'
-                'module purge\n'
-                'module load anaconda3/2020.02\n'
-                'module list\n'
-                '\n'
-                'eval "$(conda shell.bash hook)"\n'
-                'conda activate /apps/ANACONDA3/2020.02/envs/ESM-EquiBind-DiffDock\n'
-                '\n'
-                'cp -r /gpfs/apps/POWER9/ANACONDA3/2020.02/envs/ESM-EquiBind-DiffDock/modules/EquiBind/runs .\n'
-                'python /gpfs/apps/POWER9/ANACONDA3/2020.02/envs/ESM-EquiBind-DiffDock/modules/EquiBind/inference.py --config=inference.yml\n'
-            )
+            fileout.write(EQUIBIND_RUN_SCRIPT)
 
         with open('3_docking_job/job/inference.yml', 'w') as fileout:
-            fileout.writelines(
-                'run_dirs:\n'
-                '  - flexible_self_docking # the resulting coordinates will be saved here as tensors in a .pt file (but also as .sdf files if you specify an "output_directory" below)\n'
-                'inference_path: \'equibind_calculations\' # this should be your input file path as described in the main readme\n'
-                '\n'
-                'test_names: timesplit_test\n'
-                'output_directory: \'equibind_results\' # the predicted ligands will be saved as .sdf file here\n'
-                'run_corrections: True\n'
-                'use_rdkit_coords: False # generates the coordinates of the ligand with rdkit instead of using the provided conformer. If you already have a 3D structure that you want to use as initial conformer, then leave this as False\n'
-                'save_trajectories: False\n'
-                '\n'
-                'num_confs: 1 # usually this should be 1\n'
-            )
+            fileout.write(EQUIBIND_INFERENCE_YML)
 
         print(' - Job created to be sent to CTE-POWER')
         print(' - Equibind docking job created successfully.')